@@ -4,11 +4,18 @@ Daily Weather Comparison Bot
 Sends playful weather updates comparing Del Mar, CA to Boston, MA
 """
 
+import hashlib
+import orjson
 import os
 import sys
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import random
-from datetime import datetime
+import functools
+import bisect
+from datetime import datetime, timezone
 from twilio.rest import Client
 
 # ============= CONFIGURATION =============
@@ -53,142 +60,261 @@ DEL_MAR_LON = -117.2653
 BOSTON_LAT = 42.3601
 BOSTON_LON = -71.0589
 
+# Open-Meteo forecast endpoint; lat/lon may be comma-separated lists
+OPEN_METEO_URL = (
+    "https://api.open-meteo.com/v1/forecast"
+    "?latitude={lat}"
+    "&longitude={lon}"
+    "&current_weather=true"
+    "&daily=temperature_2m_max,temperature_2m_min"
+    "&temperature_unit=fahrenheit"
+    "&timezone=auto"
+)
+
+# Open-Meteo WMO weather codes -> human-readable conditions
+WEATHER_CODE_MAP = {
+    0: "Clear",
+    1: "Mostly Clear",
+    2: "Partly Cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Fog",
+    51: "Light Drizzle",
+    53: "Drizzle",
+    55: "Heavy Drizzle",
+    56: "Light Freezing Drizzle",
+    57: "Freezing Drizzle",
+    61: "Light Rain",
+    63: "Rain",
+    65: "Heavy Rain",
+    66: "Light Freezing Rain",
+    67: "Freezing Rain",
+    71: "Light Snow",
+    73: "Snow",
+    75: "Heavy Snow",
+    77: "Snow Grains",
+    80: "Light Rain Showers",
+    81: "Rain Showers",
+    82: "Heavy Rain Showers",
+    85: "Snow Showers",
+    86: "Heavy Snow Showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm with Hail",
+    99: "Thunderstorm with Heavy Hail",
+}
+
+# Shared HTTP session so both city lookups reuse pooled keep-alive connections.
+# Transient failures are retried with exponential backoff before giving up.
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    respect_retry_after_header=True,
+)
+SESSION = requests.Session()
+SESSION.mount("https://api.open-meteo.com", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=RETRY))
+
+# Weather responses are cached on disk so re-runs within the TTL skip the API
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "weather_bot")
+CACHE_TTL_SECONDS = 30 * 60
+
 
 # ============= WEATHER FETCHING =============
+def cached_get(url):
+    """Return (body, store) for url, with body served from the disk cache while fresh.
+
+    Callers invoke store() only once the body has parsed successfully, so a bad
+    reply is never cached. On a cache hit store() does nothing.
+    """
+    cache_path = os.path.join(CACHE_DIR, hashlib.sha1(url.encode()).hexdigest() + ".json")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < CACHE_TTL_SECONDS:
+            with open(cache_path, "rb") as f:
+                return f.read(), lambda: None
+    except OSError:
+        pass
+
+    response = SESSION.get(url, timeout=10)
+    response.raise_for_status()
+    body = response.content
+
+    def store():
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Caching is best-effort; never fail a run over it
+
+    return body, store
+
+
 def weather_code_to_text(code):
-    mapping = {
-        0: "Clear",
-        1: "Mostly Clear",
-        2: "Partly Cloudy",
-        3: "Overcast",
-        45: "Fog",
-        48: "Fog",
-        51: "Light Drizzle",
-        53: "Drizzle",
-        55: "Heavy Drizzle",
-        61: "Light Rain",
-        63: "Rain",
-        65: "Heavy Rain",
-        71: "Light Snow",
-        73: "Snow",
-        75: "Heavy Snow",
-        95: "Thunderstorm",
-    }
-    return mapping.get(code, "Unknown")
-
-def get_weather(lat, lon, location_name):
-    """Fetch weather using Open-Meteo (free, no API key, reliable)"""
+    return WEATHER_CODE_MAP.get(code, "Unknown")
+
+def fetch_weather_batch(locations):
+    """Fetch weather for several (lat, lon, name) locations in one Open-Meteo request"""
+    names = ", ".join(name for _, _, name in locations)
     try:
-        url = (
-            "https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}"
-            f"&longitude={lon}"
-            "&current_weather=true"
-            "&daily=temperature_2m_max,temperature_2m_min"
-            "&temperature_unit=fahrenheit"
-            "&timezone=auto"
+        url = OPEN_METEO_URL.format(
+            lat=",".join(str(lat) for lat, _, _ in locations),
+            lon=",".join(str(lon) for _, lon, _ in locations),
         )
 
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        body, store_cache = cached_get(url)
+        data = orjson.loads(body)
+
+        # Open-Meteo returns a list for multiple coordinates, an object for one
+        if isinstance(data, dict):
+            data = [data]
+        if len(data) != len(locations):
+            raise ValueError(f"expected {len(locations)} locations, got {len(data)}")
+
+        results = []
+        for (_, _, location_name), entry in zip(locations, data):
+            current = entry["current_weather"]
+            daily = entry["daily"]
 
-        current = data["current_weather"]
-        daily = data["daily"]
+            results.append({
+                "location": location_name,
+                "temp": round(current["temperature"]),
+                "condition": weather_code_to_text(current["weathercode"]),
+                "high": round(daily["temperature_2m_max"][0]),
+                "low": round(daily["temperature_2m_min"][0]),
+            })
 
-        return {
-            "location": location_name,
-            "temp": int(round(current["temperature"])),
-            "condition": weather_code_to_text(current["weathercode"]),
-            "high": int(round(daily["temperature_2m_max"][0])),
-            "low": int(round(daily["temperature_2m_min"][0])),
-        }
+        store_cache()
+        return results
 
     except Exception as e:
-        print(f"Error fetching weather for {location_name}: {e}")
+        print(f"Error fetching weather for {names}: {e}")
+        return None
+
+class _FetchFailed(Exception):
+    """Signals a failed fetch so lru_cache does not memoize it"""
+
+@functools.lru_cache(maxsize=8)
+def fetch_weather_batch_for_hour(locations, hour_bucket):
+    """Memoized fetch_weather_batch; hour_bucket rolls the cache over every hour"""
+    results = fetch_weather_batch(locations)
+    if results is None:
+        raise _FetchFailed(locations)  # raising keeps failures out of the cache
+    return results
+
+def get_weather_batch(locations):
+    """Return weather for several locations, memoized in-process for the current UTC hour"""
+    hour_bucket = datetime.now(timezone.utc).strftime("%Y-%m-%d-%H")
+    try:
+        return [dict(w) for w in fetch_weather_batch_for_hour(tuple(locations), hour_bucket)]
+    except _FetchFailed:
         return None
 
 
 # ============= MESSAGE GENERATION =============
+# Joke pools are built once at import; temperature jokes are str.format
+# templates filled with delmar_high, boston_high and temp_diff.
+OPENERS = (
+    "☀️ *California Weather Report* ☀️",
+    "🌴 Greetings from paradise! 🌴",
+    "📍 Live from the Best Coast:",
+    "🏖️ Your daily dose of sunshine envy:",
+    "☀️ Breaking news from Del Mar:",
+)
+
+TEMP_JOKES_40 = (
+    "It's a balmy {delmar_high}°F here while you're freezing at {boston_high}°F. That's a {temp_diff}° difference! 🥶",
+    "Currently {delmar_high}°F in Del Mar. Meanwhile you're experiencing a tropical {boston_high}°F. Practically twins! 😂",
+    "We're suffering through {delmar_high}°F weather. How are you managing in that heat wave of {boston_high}°F? 🏖️❄️",
+)
+
+TEMP_JOKES_30 = (
+    "Del Mar: {delmar_high}°F ☀️ | Boston: {boston_high}°F 🥶 (but who's counting the {temp_diff}° difference?)",
+    "It's only {temp_diff}° warmer here ({delmar_high}°F vs your {boston_high}°F). Barely noticeable! 😎",
+)
+
+TEMP_JOKES_DEFAULT = (
+    "We're at {delmar_high}°F, you're at {boston_high}°F. Almost the same! 😏",
+    "Today's high: {delmar_high}°F in Del Mar, {boston_high}°F in Boston. See? Not that different! (Okay, {temp_diff}° different) 🌞",
+)
+
+# Bucket i covers TEMP_DIFF_THRESHOLDS[i-1] < temp_diff <= TEMP_DIFF_THRESHOLDS[i]
+TEMP_DIFF_THRESHOLDS = (30, 40)
+TEMP_JOKE_BUCKETS = (TEMP_JOKES_DEFAULT, TEMP_JOKES_30, TEMP_JOKES_40)
+
+SNOW_JOKES = (
+    "I'd send you some sunshine but it doesn't ship well. ☀️📦",
+    "Hope you're enjoying that 'winter wonderland' experience! Meanwhile, I might go to the beach. 🏖️",
+    "Snow day for you, beach day for me? 🤷‍♂️",
+)
+
+RAIN_JOKES = (
+    "At least it's a wet cold instead of a dry cold, right? 😅",
+    "Nothing says February like rain in New England! 🌧️",
+)
+
+CLEAR_JOKES = (
+    "Not a cloud in the sky here! 😎☀️",
+)
+
+CLOSERS = (
+    "\nThink of it as character building! 💪",
+    "\nBut hey, fall foliage is nice... in 8 months! 🍂",
+    "\nYou chose this! 😂",
+    "\nSpring is only... *checks calendar* ...a while away! 🌸",
+    "\nAt least your heating bill is keeping someone employed! 💸",
+    "\nRemember: it's a dry cold! Oh wait... 🤔",
+)
+
+
 def generate_playful_message(delmar_weather, boston_weather):
     """Generate a playful comparison message"""
     
-    temp_diff = delmar_weather['high'] - boston_weather['high']
-    
-    # Playful opening lines
-    openers = [
-        "☀️ *California Weather Report* ☀️",
-        "🌴 Greetings from paradise! 🌴",
-        "📍 Live from the Best Coast:",
-        "🏖️ Your daily dose of sunshine envy:",
-        "☀️ Breaking news from Del Mar:",
-    ]
+    choice = random.choice  # local alias avoids repeated global/attribute lookups
+    delmar_high, boston_high = delmar_weather['high'], boston_weather['high']
+    temp_diff = delmar_high - boston_high
+    delmar_condition_lower = delmar_weather['condition'].lower()
+    boston_condition_lower = boston_weather['condition'].lower()
     
     # Temperature comparisons
-    if temp_diff > 40:
-        temp_jokes = [
-            f"It's a balmy {delmar_weather['high']}°F here while you're freezing at {boston_weather['high']}°F. That's a {temp_diff}° difference! 🥶",
-            f"Currently {delmar_weather['high']}°F in Del Mar. Meanwhile you're experiencing a tropical {boston_weather['high']}°F. Practically twins! 😂",
-            f"We're suffering through {delmar_weather['high']}°F weather. How are you managing in that heat wave of {boston_weather['high']}°F? 🏖️❄️",
-        ]
-    elif temp_diff > 30:
-        temp_jokes = [
-            f"Del Mar: {delmar_weather['high']}°F ☀️ | Boston: {boston_weather['high']}°F 🥶 (but who's counting the {temp_diff}° difference?)",
-            f"It's only {temp_diff}° warmer here ({delmar_weather['high']}°F vs your {boston_weather['high']}°F). Barely noticeable! 😎",
-        ]
-    else:
-        temp_jokes = [
-            f"We're at {delmar_weather['high']}°F, you're at {boston_weather['high']}°F. Almost the same! 😏",
-            f"Today's high: {delmar_weather['high']}°F in Del Mar, {boston_weather['high']}°F in Boston. See? Not that different! (Okay, {temp_diff}° different) 🌞",
-        ]
+    temp_jokes = TEMP_JOKE_BUCKETS[bisect.bisect_left(TEMP_DIFF_THRESHOLDS, temp_diff)]
     
     # Weather condition jokes
-    condition_jokes = []
-    if 'snow' in boston_weather['condition'].lower():
-        condition_jokes.extend([
-            "I'd send you some sunshine but it doesn't ship well. ☀️📦",
-            "Hope you're enjoying that 'winter wonderland' experience! Meanwhile, I might go to the beach. 🏖️",
-            "Snow day for you, beach day for me? 🤷‍♂️",
-        ])
-    elif 'rain' in boston_weather['condition'].lower():
-        condition_jokes.extend([
-            "At least it's a wet cold instead of a dry cold, right? 😅",
-            "Nothing says February like rain in New England! 🌧️",
-        ])
-    
-    if 'sunny' in delmar_weather['condition'].lower() or 'clear' in delmar_weather['condition'].lower():
-        condition_jokes.append("Not a cloud in the sky here! 😎☀️")
+    condition_jokes = ()
+    if 'snow' in boston_condition_lower:
+        condition_jokes = SNOW_JOKES
+    elif 'rain' in boston_condition_lower:
+        condition_jokes = RAIN_JOKES
     
-    # Closing lines
-    closers = [
-        "\nThink of it as character building! 💪",
-        "\nBut hey, fall foliage is nice... in 8 months! 🍂",
-        "\nYou chose this! 😂",
-        "\nSpring is only... *checks calendar* ...a while away! 🌸",
-        "\nAt least your heating bill is keeping someone employed! 💸",
-        "\nRemember: it's a dry cold! Oh wait... 🤔",
-    ]
+    if 'clear' in delmar_condition_lower:
+        condition_jokes += CLEAR_JOKES
     
     # Assemble message
-    message_parts = [
-        random.choice(openers),
-        "",
-        random.choice(temp_jokes),
-    ]
-    
-    if condition_jokes:
-        message_parts.append(random.choice(condition_jokes))
+    opener = choice(OPENERS)
+    temp_line = choice(temp_jokes).format(
+        delmar_high=delmar_high,
+        boston_high=boston_high,
+        temp_diff=temp_diff,
+    )
+    condition_line = f"\n{choice(condition_jokes)}" if condition_jokes else ""
+    closer = choice(CLOSERS)
     
-    message_parts.append(random.choice(closers))
-    
-    return "\n".join(message_parts)
+    return f"{opener}\n\n{temp_line}{condition_line}\n{closer}"
 
 
 # ============= SMS SENDING =============
+@functools.lru_cache(maxsize=1)
+def twilio_client():
+    """Return a shared Twilio client, built on first use"""
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+
 def send_sms(message):
     """Send SMS via Twilio"""
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        client = twilio_client()
         
         message_obj = client.messages.create(
             body=message,
@@ -210,17 +336,19 @@ def main():
     debug_env()
     enforce_env()
     
-    # Fetch weather data
-    print("📡 Fetching Del Mar weather...")
-    delmar = get_weather(DEL_MAR_LAT, DEL_MAR_LON, "Del Mar, CA")
+    # Fetch weather data (both cities in a single request)
+    print("📡 Fetching Del Mar and Boston weather...")
+    weather = get_weather_batch([
+        (DEL_MAR_LAT, DEL_MAR_LON, "Del Mar, CA"),
+        (BOSTON_LAT, BOSTON_LON, "Boston, MA"),
+    ])
     
-    print("📡 Fetching Boston weather...")
-    boston = get_weather(BOSTON_LAT, BOSTON_LON, "Boston, MA")
-    
-    if not delmar or not boston:
+    if not weather:
         print("❌ Failed to fetch weather data")
         return
     
+    delmar, boston = weather
+    
     # Generate message
     print("✍️  Generating playful message...")
     message = generate_playful_message(delmar, boston)
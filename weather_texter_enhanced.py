@@ -11,10 +11,19 @@ Features:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import random
+import functools
+import bisect
+import hashlib
+import orjson
 import os
+import sys
+import time
 import argparse
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from twilio.rest import Client
 
 # ============= CONFIGURATION =============
@@ -30,141 +39,304 @@ DEL_MAR_LON = -117.2653
 BOSTON_LAT = 42.3601
 BOSTON_LON = -71.0589
 
+# Open-Meteo forecast endpoint, requesting only the fields the bot uses so the
+# response stays around 1 KB
+OPEN_METEO_URL = (
+    "https://api.open-meteo.com/v1/forecast"
+    "?latitude={lat}"
+    "&longitude={lon}"
+    "&current=temperature_2m,apparent_temperature,weather_code,relative_humidity_2m"
+    "&daily=temperature_2m_max,temperature_2m_min"
+    "&temperature_unit=fahrenheit"
+    "&timezone=auto"
+)
+
+# Open-Meteo WMO weather codes -> human-readable conditions
+WEATHER_CODE_MAP = {
+    0: "Clear",
+    1: "Mostly Clear",
+    2: "Partly Cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Fog",
+    51: "Light Drizzle",
+    53: "Drizzle",
+    55: "Heavy Drizzle",
+    56: "Light Freezing Drizzle",
+    57: "Freezing Drizzle",
+    61: "Light Rain",
+    63: "Rain",
+    65: "Heavy Rain",
+    66: "Light Freezing Rain",
+    67: "Freezing Rain",
+    71: "Light Snow",
+    73: "Snow",
+    75: "Heavy Snow",
+    77: "Snow Grains",
+    80: "Light Rain Showers",
+    81: "Rain Showers",
+    82: "Heavy Rain Showers",
+    85: "Snow Showers",
+    86: "Heavy Snow Showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm with Hail",
+    99: "Thunderstorm with Heavy Hail",
+}
+
+SEPARATOR = "=" * 60
+
+# Shared HTTP session so both city lookups reuse pooled keep-alive connections.
+# Transient failures are retried with exponential backoff before giving up.
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(['GET']),
+    respect_retry_after_header=True,
+)
+SESSION = requests.Session()
+SESSION.mount('https://api.open-meteo.com', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=RETRY))
+
+# Weather responses are cached on disk so re-runs within the TTL skip the API
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'weather_bot')
+CACHE_TTL_SECONDS = 30 * 60
+
 
 # ============= WEATHER FETCHING =============
-def get_weather(lat, lon, location_name):
-    """Fetch weather using wttr.in service (free, no API key)"""
+def cached_get(url):
+    """Return (body, store) for url, with body served from the disk cache while fresh.
+
+    Callers invoke store() only once the body has parsed successfully, so a bad
+    reply is never cached. On a cache hit store() does nothing.
+    """
+    cache_path = os.path.join(CACHE_DIR, hashlib.sha1(url.encode()).hexdigest() + '.json')
     try:
-        url = f"https://wttr.in/{lat},{lon}?format=j1"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        if time.time() - os.path.getmtime(cache_path) < CACHE_TTL_SECONDS:
+            with open(cache_path, 'rb') as f:
+                return f.read(), lambda: None
+    except OSError:
+        pass
+
+    response = SESSION.get(url, timeout=10)
+    response.raise_for_status()
+    body = response.content
+
+    def store():
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Caching is best-effort; never fail a run over it
+
+    return body, store
+
+
+def fetch_weather(lat, lon, location_name):
+    """Fetch weather using Open-Meteo (free, no API key)"""
+    try:
+        url = OPEN_METEO_URL.format(lat=lat, lon=lon)
+        body, store_cache = cached_get(url)
+        data = orjson.loads(body)
         
-        current = data['current_condition'][0]
-        today = data['weather'][0]
+        current = data['current']
+        daily = data['daily']
         
-        return {
+        weather = {
             'location': location_name,
-            'temp': int(current['temp_F']),
-            'condition': current['weatherDesc'][0]['value'],
-            'high': int(today['maxtempF']),
-            'low': int(today['mintempF']),
-            'humidity': int(current['humidity']),
-            'feels_like': int(current['FeelsLikeF'])
+            'temp': round(current['temperature_2m']),
+            'condition': WEATHER_CODE_MAP.get(current['weather_code'], 'Unknown'),
+            'high': round(daily['temperature_2m_max'][0]),
+            'low': round(daily['temperature_2m_min'][0]),
+            'humidity': round(current['relative_humidity_2m']),
+            'feels_like': round(current['apparent_temperature'])
         }
+        
+        store_cache()
+        return weather
     except requests.exceptions.RequestException as e:
         print(f"❌ Network error fetching weather for {location_name}: {e}")
         return None
-    except (KeyError, ValueError) as e:
+    except (KeyError, IndexError, TypeError, ValueError) as e:
         print(f"❌ Error parsing weather data for {location_name}: {e}")
         return None
 
 
+class _FetchFailed(Exception):
+    """Signals a failed fetch so lru_cache does not memoize it"""
+
+
+@functools.lru_cache(maxsize=8)
+def fetch_weather_for_hour(lat, lon, location_name, hour_bucket):
+    """Memoized fetch_weather; hour_bucket rolls the cache over every hour"""
+    weather = fetch_weather(lat, lon, location_name)
+    if weather is None:
+        raise _FetchFailed(location_name)  # raising keeps failures out of the cache
+    return weather
+
+
+def get_weather(lat, lon, location_name):
+    """Return weather for a location, memoized in-process for the current UTC hour"""
+    hour_bucket = datetime.now(timezone.utc).strftime('%Y-%m-%d-%H')
+    try:
+        return dict(fetch_weather_for_hour(lat, lon, location_name, hour_bucket))
+    except _FetchFailed:
+        return None
+
+
 # ============= MESSAGE GENERATION =============
+# Joke pools are built once at import. Temperature jokes are str.format
+# templates filled with delmar_high, boston_high and temp_diff; feels-like
+# jokes with delmar_feels_like and boston_feels_like.
+OPENERS = (
+    "☀️ *California Weather Report* ☀️",
+    "🌴 Greetings from paradise! 🌴",
+    "📍 Live from the Best Coast:",
+    "🏖️ Your daily dose of sunshine envy:",
+    "☀️ Breaking news from Del Mar:",
+    "🌊 Surf's up and so is the temperature!",
+    "🎯 Your daily weather flex:",
+)
+
+TEMP_JOKES_45 = (
+    "It's a balmy {delmar_high}°F here while you're experiencing the arctic tundra at {boston_high}°F. That's a {temp_diff}° difference! 🥶❄️",
+    "We're absolutely SUFFERING at {delmar_high}°F. I know, I know... you've got it worse at {boston_high}°F. 😂",
+    "High of {delmar_high}°F here. You're at {boston_high}°F. Math says that's {temp_diff}° warmer, but who's counting? (Me. I'm counting.) 😎",
+    "Temperature check: Del Mar {delmar_high}°F ☀️ | Boston {boston_high}°F 🧊 | Difference: 'Why do you still live there?' degrees",
+)
+
+TEMP_JOKES_35 = (
+    "Del Mar: {delmar_high}°F ☀️ | Boston: {boston_high}°F 🥶 (only {temp_diff}° difference, totally not rubbing it in)",
+    "It's {temp_diff}° warmer here ({delmar_high}°F vs your {boston_high}°F). That's like... a whole different season! 🌞❄️",
+    "We hit {delmar_high}°F today. You're at {boston_high}°F. But I'm sure the cold builds character or something! 💪🥶",
+)
+
+TEMP_JOKES_25 = (
+    "Today's forecast: {delmar_high}°F in Del Mar, {boston_high}°F in Boston. Almost twins! (If one twin lives in paradise) 😏",
+    "High of {delmar_high}°F vs {boston_high}°F. See? Only {temp_diff}° apart. Basically neighbors! 🌴🧊",
+)
+
+TEMP_JOKES_DEFAULT = (
+    "We're at {delmar_high}°F, you're at {boston_high}°F. Practically the same! 😅",
+    "Shockingly close today: {delmar_high}°F here, {boston_high}°F there. Only {temp_diff}° different!",
+)
+
+# Bucket i covers TEMP_DIFF_THRESHOLDS[i-1] < temp_diff <= TEMP_DIFF_THRESHOLDS[i]
+TEMP_DIFF_THRESHOLDS = (25, 35, 45)
+TEMP_JOKE_BUCKETS = (TEMP_JOKES_DEFAULT, TEMP_JOKES_25, TEMP_JOKES_35, TEMP_JOKES_45)
+
+FEELS_LIKE_JOKES = (
+    "(Feels like {delmar_feels_like}°F here vs {boston_feels_like}°F there... wind chill is your nemesis!) 🌬️",
+)
+
+SNOW_JOKES = (
+    "I'd send you some sunshine but it doesn't ship well. ☀️📦",
+    "Hope you're enjoying that 'winter wonderland' experience! I might hit the beach later. 🏖️",
+    "Snow day for you, beach day for me? Life's wild! 🤷‍♂️⛄",
+    "Remember when you said you 'love the seasons'? How's that going? ⛄❄️",
+)
+
+RAIN_JOKES = (
+    "At least your cold is hydrated! 🌧️",
+    "Nothing says February like cold rain in New England! 🌧️😬",
+)
+
+CLOUD_JOKES = (
+    "Cloudy with a chance of regret about living in New England? ☁️",
+)
+
+CLEAR_JOKES = (
+    "Not a cloud in the sky here! Debating between beach or pool. 😎☀️",
+)
+
+PARTLY_CLOUDY_JOKES = (
+    "We've got a few clouds. It's basically suffering. 😅☁️",
+)
+
+CLOSERS = (
+    "\nThink of it as character building! 💪",
+    "\nBut hey, fall foliage is pretty... in 8 months! 🍂",
+    "\nYou chose this! Well, someone did. 😂",
+    "\nSpring is only... *checks calendar* ...a few months away! 🌸",
+    "\nAt least your heating bill keeps the economy going! 💸",
+    "\nStay warm, buddy! ❄️ (I'll be wearing shorts)",
+    "\nRemember: You can always visit! 🛫☀️",
+    "\nOn the bright side... okay I got nothing. Stay strong! 💪",
+    "\nJust remember: it's a dry cold! Oh wait... 🤔",
+)
+
+
 def generate_playful_message(delmar_weather, boston_weather):
     """Generate a playful comparison message with varied commentary"""
     
-    temp_diff = delmar_weather['high'] - boston_weather['high']
-    feels_like_diff = delmar_weather['feels_like'] - boston_weather['feels_like']
-    
-    # Playful opening lines
-    openers = [
-        "☀️ *California Weather Report* ☀️",
-        "🌴 Greetings from paradise! 🌴",
-        "📍 Live from the Best Coast:",
-        "🏖️ Your daily dose of sunshine envy:",
-        "☀️ Breaking news from Del Mar:",
-        "🌊 Surf's up and so is the temperature!",
-        "🎯 Your daily weather flex:",
-    ]
+    choice = random.choice  # local alias avoids repeated global/attribute lookups
+    delmar_high, boston_high = delmar_weather['high'], boston_weather['high']
+    delmar_feels_like, boston_feels_like = delmar_weather['feels_like'], boston_weather['feels_like']
+    temp_diff = delmar_high - boston_high
+    feels_like_diff = delmar_feels_like - boston_feels_like
     
     # Temperature comparisons based on severity
-    if temp_diff > 45:
-        temp_jokes = [
-            f"It's a balmy {delmar_weather['high']}°F here while you're experiencing the arctic tundra at {boston_weather['high']}°F. That's a {temp_diff}° difference! 🥶❄️",
-            f"We're absolutely SUFFERING at {delmar_weather['high']}°F. I know, I know... you've got it worse at {boston_weather['high']}°F. 😂",
-            f"High of {delmar_weather['high']}°F here. You're at {boston_weather['high']}°F. Math says that's {temp_diff}° warmer, but who's counting? (Me. I'm counting.) 😎",
-            f"Temperature check: Del Mar {delmar_weather['high']}°F ☀️ | Boston {boston_weather['high']}°F 🧊 | Difference: 'Why do you still live there?' degrees",
-        ]
-    elif temp_diff > 35:
-        temp_jokes = [
-            f"Del Mar: {delmar_weather['high']}°F ☀️ | Boston: {boston_weather['high']}°F 🥶 (only {temp_diff}° difference, totally not rubbing it in)",
-            f"It's {temp_diff}° warmer here ({delmar_weather['high']}°F vs your {boston_weather['high']}°F). That's like... a whole different season! 🌞❄️",
-            f"We hit {delmar_weather['high']}°F today. You're at {boston_weather['high']}°F. But I'm sure the cold builds character or something! 💪🥶",
-        ]
-    elif temp_diff > 25:
-        temp_jokes = [
-            f"Today's forecast: {delmar_weather['high']}°F in Del Mar, {boston_weather['high']}°F in Boston. Almost twins! (If one twin lives in paradise) 😏",
-            f"High of {delmar_weather['high']}°F vs {boston_weather['high']}°F. See? Only {temp_diff}° apart. Basically neighbors! 🌴🧊",
-        ]
-    else:
-        temp_jokes = [
-            f"We're at {delmar_weather['high']}°F, you're at {boston_weather['high']}°F. Practically the same! 😅",
-            f"Shockingly close today: {delmar_weather['high']}°F here, {boston_weather['high']}°F there. Only {temp_diff}° different!",
-        ]
+    temp_jokes = TEMP_JOKE_BUCKETS[bisect.bisect_left(TEMP_DIFF_THRESHOLDS, temp_diff)]
     
     # "Feels like" commentary
-    feels_like_jokes = []
-    if feels_like_diff > 40:
-        feels_like_jokes.append(f"(Feels like {delmar_weather['feels_like']}°F here vs {boston_weather['feels_like']}°F there... wind chill is your nemesis!) 🌬️")
+    feels_like_jokes = FEELS_LIKE_JOKES if feels_like_diff > 40 else ()
     
     # Weather condition jokes
-    condition_jokes = []
+    condition_jokes = ()
     boston_condition_lower = boston_weather['condition'].lower()
     
     if 'snow' in boston_condition_lower:
-        condition_jokes.extend([
-            "I'd send you some sunshine but it doesn't ship well. ☀️📦",
-            "Hope you're enjoying that 'winter wonderland' experience! I might hit the beach later. 🏖️",
-            "Snow day for you, beach day for me? Life's wild! 🤷‍♂️⛄",
-            "Remember when you said you 'love the seasons'? How's that going? ⛄❄️",
-        ])
+        condition_jokes = SNOW_JOKES
     elif 'rain' in boston_condition_lower or 'drizzle' in boston_condition_lower:
-        condition_jokes.extend([
-            "At least your cold is hydrated! 🌧️",
-            "Nothing says February like cold rain in New England! 🌧️😬",
-        ])
-    elif 'cloud' in boston_condition_lower:
-        condition_jokes.append("Cloudy with a chance of regret about living in New England? ☁️")
+        condition_jokes = RAIN_JOKES
+    elif 'cloud' in boston_condition_lower or 'overcast' in boston_condition_lower:
+        condition_jokes = CLOUD_JOKES
     
     delmar_condition_lower = delmar_weather['condition'].lower()
-    if 'sunny' in delmar_condition_lower or 'clear' in delmar_condition_lower:
-        condition_jokes.append("Not a cloud in the sky here! Debating between beach or pool. 😎☀️")
+    if 'clear' in delmar_condition_lower:
+        condition_jokes += CLEAR_JOKES
     elif 'partly' in delmar_condition_lower:
-        condition_jokes.append("We've got a few clouds. It's basically suffering. 😅☁️")
-    
-    # Closing lines
-    closers = [
-        "\nThink of it as character building! 💪",
-        "\nBut hey, fall foliage is pretty... in 8 months! 🍂",
-        "\nYou chose this! Well, someone did. 😂",
-        "\nSpring is only... *checks calendar* ...a few months away! 🌸",
-        "\nAt least your heating bill keeps the economy going! 💸",
-        "\nStay warm, buddy! ❄️ (I'll be wearing shorts)",
-        "\nRemember: You can always visit! 🛫☀️",
-        "\nOn the bright side... okay I got nothing. Stay strong! 💪",
-        "\nJust remember: it's a dry cold! Oh wait... 🤔",
-    ]
+        condition_jokes += PARTLY_CLOUDY_JOKES
     
     # Assemble message
-    message_parts = [
-        random.choice(openers),
-        "",
-        random.choice(temp_jokes),
-    ]
+    opener = choice(OPENERS)
+    temp_line = choice(temp_jokes).format(
+        delmar_high=delmar_high,
+        boston_high=boston_high,
+        temp_diff=temp_diff,
+    )
     
+    feels_like_line = ""
     if feels_like_jokes and random.random() > 0.5:  # 50% chance to include feels-like
-        message_parts.append(random.choice(feels_like_jokes))
-    
-    if condition_jokes:
-        message_parts.append(random.choice(condition_jokes))
+        feels_like_line = "\n" + choice(feels_like_jokes).format(
+            delmar_feels_like=delmar_feels_like,
+            boston_feels_like=boston_feels_like,
+        )
     
-    message_parts.append(random.choice(closers))
+    condition_line = f"\n{choice(condition_jokes)}" if condition_jokes else ""
+    closer = choice(CLOSERS)
     
-    return "\n".join(message_parts)
+    return f"{opener}\n\n{temp_line}{feels_like_line}{condition_line}\n{closer}"
 
 
 # ============= SMS SENDING =============
+@functools.lru_cache(maxsize=1)
+def twilio_client():
+    """Return a shared Twilio client, built on first use"""
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+
+def check_credentials():
+    """Report whether all Twilio credentials are configured"""
+    if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, FRIEND_PHONE_NUMBER]):
+        print("❌ Missing Twilio credentials. Set environment variables:")
+        print("   TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, FRIEND_PHONE_NUMBER")
+        return False
+    return True
+
+
 def send_sms(message, dry_run=False):
     """Send SMS via Twilio (or simulate in dry-run mode)"""
     
@@ -172,13 +344,11 @@ def send_sms(message, dry_run=False):
         print("🧪 DRY RUN MODE - Message NOT actually sent")
         return True
     
-    if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, FRIEND_PHONE_NUMBER]):
-        print("❌ Missing Twilio credentials. Set environment variables:")
-        print("   TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, FRIEND_PHONE_NUMBER")
+    if not check_credentials():
         return False
     
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        client = twilio_client()
         
         message_obj = client.messages.create(
             body=message,
@@ -205,40 +375,45 @@ def main():
                        help='Minimal output (for cron jobs)')
     args = parser.parse_args()
     
-    if not args.quiet:
-        print(f"🤖 Weather Comparison Bot - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print()
+    # Fail fast before spending any API calls on a run that can't send
+    if not args.dry_run and not check_credentials():
+        return 1
+    
+    # Progress output is a no-op in quiet mode, so no per-line checks are needed
+    log = (lambda *_args, **_kwargs: None) if args.quiet else print
+    
+    log(f"🤖 Weather Comparison Bot - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    log()
     
     # Fetch weather data
-    if not args.quiet:
-        print("📡 Fetching weather data...")
+    log("📡 Fetching weather data...")
     
-    delmar = get_weather(DEL_MAR_LAT, DEL_MAR_LON, "Del Mar, CA")
-    boston = get_weather(BOSTON_LAT, BOSTON_LON, "Boston, MA")
+    # Both lookups are independent, so fetch them in parallel
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        delmar_future = executor.submit(get_weather, DEL_MAR_LAT, DEL_MAR_LON, "Del Mar, CA")
+        boston_future = executor.submit(get_weather, BOSTON_LAT, BOSTON_LON, "Boston, MA")
+        delmar = delmar_future.result()
+        boston = boston_future.result()
     
     if not delmar or not boston:
         print("❌ Failed to fetch weather data")
         return 1
     
-    if not args.quiet:
-        print(f"   Del Mar: {delmar['high']}°F (feels like {delmar['feels_like']}°F) - {delmar['condition']}")
-        print(f"   Boston: {boston['high']}°F (feels like {boston['feels_like']}°F) - {boston['condition']}")
-        print()
-    
     # Generate message
     message = generate_playful_message(delmar, boston)
     
-    if not args.quiet:
-        print("="*60)
-        print("MESSAGE PREVIEW:")
-        print("="*60)
-        print(message)
-        print("="*60)
-        print()
+    log(
+        f"   Del Mar: {delmar['high']}°F (feels like {delmar['feels_like']}°F) - {delmar['condition']}\n"
+        f"   Boston: {boston['high']}°F (feels like {boston['feels_like']}°F) - {boston['condition']}\n"
+    )
+    
+    # The preview is only useful to a human watching (or to a dry run), so
+    # skip building it entirely when running headless under cron
+    if not args.quiet and (args.dry_run or sys.stdout.isatty()):
+        log(f"{SEPARATOR}\nMESSAGE PREVIEW:\n{SEPARATOR}\n{message}\n{SEPARATOR}\n")
     
     # Send SMS
-    if not args.quiet:
-        print("📱 Sending message...")
+    log("📱 Sending message...")
     
     success = send_sms(message, dry_run=args.dry_run)
     
@@ -246,8 +421,7 @@ def main():
         print(f"ERROR: Failed to send message at {datetime.now()}")
         return 1
     
-    if not args.quiet:
-        print("\n✅ Complete!")
+    log("\n✅ Complete!")
     
     return 0
 